@@ -1,19 +1,28 @@
+import functools
 import networkx as N
 
 class Preorder:
   '''
   A preorder with support for top and bottom elements.
   '''
+  __slots__ = ('bots', 'tops', 'graph', 'good_closure', 'node_bit', 'reach', 'version', '_le')
   def __init__(self):
     self.bots = set()
     self.tops = set()
     # Invariant:
     #   good_closure ==>
-    #     closure is reflexive transitive closure of graph
-    #     with bot elements self.bots and top elements self.tops
+    #     node_bit assigns each element a bit index and reach[x] is the
+    #     bitmask of everything reachable from x in the reflexive transitive
+    #     closure of graph with bot elements self.bots and top elements self.tops
     self.graph = N.DiGraph()
     self.good_closure = True
-    self.closure = self.graph
+    self.node_bit = {}
+    self.reach = {}
+    # Bumped on every mutation; lets callers key caches on the poset state.
+    self.version = 0
+    # Per-instance lru_cache so repeated le() queries skip even the
+    # make_closure staleness check; cleared whenever the poset changes.
+    self._le = functools.lru_cache(maxsize=None)(self._le_uncached)
   def elements(self): return self.graph.nodes
   def generator_graph(self):
     g = N.DiGraph(self.graph)
@@ -31,12 +40,30 @@ class Preorder:
   def make_closure(self):
     '''Recompute the transitive closure.'''
     if self.good_closure: return
+    # Int-encode the nodes and compute reachability bit-parallel: each SCC of
+    # the generator graph gets a bitmask of everything it reaches, OR-merged
+    # over the condensation in reverse topological order. The per-node BFS
+    # this replaces redid the shared downstream work once per source node.
     g = self.generator_graph()
-    self.closure = N.transitive_closure(g, reflexive=True)
+    index = {v: i for i, v in enumerate(g.nodes)}
+    cond = N.condensation(g)
+    order = list(N.topological_sort(cond))
+    scc_reach = {}
+    for scc in reversed(order):
+      bits = 0
+      for v in cond.nodes[scc]['members']: bits |= 1 << index[v]
+      for succ in cond.successors(scc): bits |= scc_reach[succ]
+      scc_reach[scc] = bits
+    # Keep the bitset representation: le() is then two dict probes and a
+    # shift, with no per-query pair materialization
+    self.node_bit = index
+    self.reach = {v: scc_reach[scc] for scc in order for v in cond.nodes[scc]['members']}
     self.good_closure = True
   def touch_closure(self):
     '''Mark transitive closure for recomputation.'''
     self.good_closure = False
+    self.version += 1
+    self._le.cache_clear()
   def add_bot(self, b):
     '''Add b as a bottom element.'''
     self.touch_closure()
@@ -57,10 +84,14 @@ class Preorder:
     self.touch_closure()
     self.graph.add_edge(x, y)
     return self
+  def _le_uncached(self, x, y):
+    self.make_closure()
+    row = self.reach.get(x)
+    bit = self.node_bit.get(y)
+    return row is not None and bit is not None and bool(row >> bit & 1)
   def le(self, x, y):
     '''Check whether x <= y in the poset.'''
-    self.make_closure()
-    return self.closure.has_edge(x, y)
+    return self._le(x, y)
 
 if __name__ == '__main__':
   g = N.DiGraph([(0, 1), (1, 0), (2, 2), (0, 3), (3, 4)])
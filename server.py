@@ -46,15 +46,23 @@ S.prec_ge(App.n, App.m) # left-associative
 S.prec_ge(App.n, Lam.m) # application binds stronger than λ
 
 class Stuck(Exception): pass
+# One handler per head constructor, keyed by type. Reading fields directly
+# (m.m.x / m.m.e) instead of matching F([x, e]) skips the unwrap machinery;
+# subst freshens binders itself, so this stays capture-avoiding.
+def _step_lam(m):
+  f = m.m
+  return Lam(F(f.x, step(f.e)))
+def _step_app(m):
+  f, n = m.m, m.n
+  if type(f) is Lam: return f.m.e.subst({f.m.x: n})
+  try: return App(step(f), n)
+  except Stuck: return App(f, step(n))
+def _step_v(m): raise Stuck()
+_STEP = {Lam: _step_lam, App: _step_app, V: _step_v}
 def step(m):
-  match m:
-    case Lam(F([x, m])): return Lam(F(x, step(m)))
-    case App(Lam(F([x, m])), n): return m.subst({x: n})
-    case App(m, n):
-      try: return App(step(m), n)
-      except Stuck: return App(m, step(n))
-    case V(x): raise Stuck()
-    case _: raise ValueError(f'step({m})')
+  try: h = _STEP[type(m)]
+  except KeyError: raise ValueError(f'step({m})')
+  return h(m)
 
 def trace(m, bound=10):
   res = [m]
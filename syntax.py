@@ -1,5 +1,15 @@
+import itertools
 import lark as L
 import networkx as N
+import weakref
+from operator import attrgetter
+from types import FunctionType
+try:
+  # Lazily yields one unambiguous tree at a time, unlike CollapseAmbiguities
+  # which materializes every derivation up front
+  from lark_ambig_tools import Disambiguator
+except ImportError:
+  Disambiguator = None
 
 # Global poset on cursor positions used by pretty-printer (see help(mixfix))
 from preorder import Preorder
@@ -25,12 +35,9 @@ def prec_top(p):
 
 # ---------- Name binding ----------
 
-def nats():
-  n = 0
-  while True:
-    yield n
-    n += 1
-global_nats = nats()
+# Source of fresh disambiguators. itertools.count is a C-level counter, so
+# next() costs no Python frame, unlike the generator it replaces.
+global_nats = itertools.count()
 
 class Name:
   '''
@@ -38,11 +45,32 @@ class Name:
   - x is the 'pretty name', usually specified by the user
   - n is a disambiguator used to ensure that bound variables are never shadowed
   '''
-  def __init__(self, x, n=None):
-    self.x = x
-    self.n = n
-  def __hash__(self): return hash((self.x, self.n))
-  def __eq__(self, other): return self.x == other.x and self.n == other.n
+  __slots__ = ('x', 'n', '_hash', '__weakref__')
+  # Interning table: at most one live Name per (x, n). The parser mints the
+  # same (x, None) names over and over; interning makes those pointer-equal,
+  # so the identity fast paths in __eq__ and the renaming dicts hit.
+  # Weak values, so names die with the last term that mentions them.
+  _intern = weakref.WeakValueDictionary()
+  def __new__(cls, x, n=None):
+    key = (x, n)
+    self = cls._intern.get(key)
+    if self is None:
+      self = super().__new__(cls)
+      self.x = x
+      self.n = n
+      # Names are immutable, so the hash can be computed once up front instead
+      # of building a tuple and re-hashing the string on every dict probe.
+      self._hash = hash(key)
+      cls._intern[key] = self
+    return self
+  def __hash__(self): return self._hash
+  def __eq__(self, other):
+    # Interning makes equal names identical, so the common case is the `is`.
+    # On a miss, the cached hashes reject almost everything in O(1) and the
+    # fused tuple compare settles the rest in a single C-level comparison.
+    if self is other: return True
+    if type(other) is not Name: return NotImplemented
+    return self._hash == other._hash and (self.x, self.n) == (other.x, other.n)
   def __repr__(self): return f'Name({self.x}, {self.n})'
   def __str__(self): return self.x if self.n is None else f'{self.x}@{self.n}'
   def fresh(self): return Name(self.x, next(global_nats))
@@ -54,13 +82,27 @@ class V:
   Usually not used to construct variables explicitly; see help(F).
   '''
   __match_args__ = ('x',)
+  __slots__ = ('x',)
   def __init__(self, x): self.x = x
-  def __eq__(self, other, renaming={}): return renaming[self.x] == other.x if self.x in renaming else self.x == other.x
+  def __eq__(self, other, renaming=None):
+    # renaming is (lmap, rmap, depth) as threaded by F.__eq__: each side's
+    # bound names map to the de Bruijn level of their binder. Two variables
+    # agree iff both are bound at the same level or both are the same free name.
+    if type(other) is not V: return False
+    if renaming is None: return self.x == other.x
+    lmap, rmap, _ = renaming
+    return lmap.get(self.x, self.x) == rmap.get(other.x, other.x)
   def __repr__(self): return f'V({repr(self.x)})'
   def __str__(self): return self.str(None)
-  def fresh(self, renaming={}): return V(renaming[self.x]) if self.x in renaming else self
-  def subst(self, substitution): return substitution[self.x] if self.x in substitution else self
-  def simple_names(self, renaming={}, in_use=None): return V(renaming[self.x]) if self.x in renaming else self
+  _has_binder = False # a bare variable contains no F
+  def fresh(self, renaming={}):
+    # Single probe: renaming never maps a name to None
+    y = renaming.get(self.x)
+    return self if y is None else V(y)
+  def subst(self, substitution): return substitution.get(self.x, self)
+  def simple_names(self, renaming={}, in_use=None):
+    y = renaming.get(self.x)
+    return self if y is None else V(y)
   def fvs(self): return {self.x}
   def no_parens(self): return self
   def str(self, mode, left_prec='bot', right_prec='bot', prec_order=global_prec_order): return str(self.x)
@@ -81,9 +123,10 @@ class F:
   be scoped with respect to a stale version of x.
   '''
   __match_args__ = ('unwrap',)
+  __slots__ = ('x', 'e', '_cached_unwrap', '_str_cache', '_cached_fvs')
+  _has_binder = True # an F is itself a binder
   def __init__(self, x, e=None):
-    fn = type(lambda x: x)
-    if type(x) is str and type(e) is type(lambda x: x):
+    if type(x) is str and type(e) is FunctionType:
       self.x = Name(x).fresh()
       self.e = e(V(self.x))
     elif type(x) is Name:
@@ -91,19 +134,33 @@ class F:
       self.e = e
     else:
       raise ValueError(f'F({repr(x)}, {repr(e)})')
+    # Caches for unwrap (see get_unwrap), str, and fvs; filled in lazily
+    self._cached_unwrap = None
+    self._str_cache = None
+    self._cached_fvs = None
 
   def __repr__(self):
     return f'F({repr(self.x)}, {repr(self.e)})'
   
-  def __eq__(self, other, renaming={}):
-    return type(other) is F and self.e.__eq__(other.e, renaming | {self.x: other.x})
+  def __eq__(self, other, renaming=None):
+    # Equality up to renaming via de Bruijn levels: both binders are mapped to
+    # the current depth in a pair of shared dicts (extended in place and
+    # restored on exit) instead of copying a renaming dict per binder.
+    if type(other) is not F: return False
+    lmap, rmap, depth = ({}, {}, 0) if renaming is None else renaming
+    lold, rold = lmap.get(self.x), rmap.get(other.x)
+    lmap[self.x] = rmap[other.x] = depth
+    try: return self.e.__eq__(other.e, (lmap, rmap, depth + 1))
+    finally:
+      if lold is None: del lmap[self.x]
+      else: lmap[self.x] = lold
+      if rold is None: del rmap[other.x]
+      else: rmap[other.x] = rold
 
   def __str__(self): return self.str(None)
 
-  def fresh(self, renaming={}):
-    x = self.x.fresh()
-    e = self.e.fresh(renaming | {self.x: x})
-    return F(x, e)
+  def fresh(self, renaming=None):
+    return _fresh(self, {} if renaming is None else renaming)
 
   def subst(self, substitution):
     x = self.x.fresh()
@@ -113,28 +170,91 @@ class F:
   def simple_names(self, renaming={}, in_use=None):
     if in_use is None: in_use = set(v for _, v in renaming.items())
     banned = in_use | self.fvs()
-    x = (
-      self.x.with_n(None) if self.x.with_n(None) not in banned else
-      next(self.x.with_n(n) for n in nats() if self.x.with_n(n) not in banned)
-    )
+    x = self.x.with_n(None)
+    if x in banned:
+      n = 0
+      while self.x.with_n(n) in banned: n += 1
+      x = self.x.with_n(n)
     e = self.e.simple_names(renaming | {self.x: x}, in_use | {x})
     return F(x, e)
 
   def fvs(self):
-    return self.e.fvs() - {self.x}
+    # Terms are immutable, so free variables can be computed once. Stored as
+    # a frozenset so the cached value can't be mutated by callers.
+    if self._cached_fvs is None:
+      self._cached_fvs = frozenset(self.e.fvs()) - {self.x}
+    return self._cached_fvs
 
   def no_parens(self): return F(self.x, self.e.no_parens())
 
   def get_unwrap(self):
-    e = self.fresh()
-    res = [e.x, e.e]
-    return res
+    # Freshening is only needed to keep the extracted name and body in sync, so
+    # the result can be computed once and replayed on every subsequent match.
+    # Stored as a tuple: sequence patterns like F([x, e]) match it just as
+    # well, it's immutable, and handing it out needs no defensive copy.
+    if self._cached_unwrap is None:
+      e = self.fresh()
+      self._cached_unwrap = (e.x, e.e)
+    return self._cached_unwrap
   def set_unwrap(self): assert False
   unwrap = property(get_unwrap, set_unwrap)
 
   def str(self, mode, left_prec='bot', right_prec='bot', prec_order=global_prec_order):
+    # Same memoization as the @mixfix to_str: binders are immutable and the
+    # left cursor position always resets to bot, so the rendering only
+    # depends on the mode, the right context, and the poset state.
+    key = (mode, right_prec, prec_order.version)
+    cache = self._str_cache
+    if cache is None: cache = self._str_cache = {}
+    elif key in cache: return cache[key]
     dot = '.' if mode is None else '. '
-    return f"{str(self.x)}{dot}{self.e.str(mode, left_prec='bot', right_prec=right_prec, prec_order=prec_order)}"
+    res = f"{str(self.x)}{dot}{self.e.str(mode, left_prec='bot', right_prec=right_prec, prec_order=prec_order)}"
+    cache[key] = res
+    return res
+
+# Iterative freshening shared by F.fresh and the @mixfix-generated fresh.
+# A single explicit stack replaces the mutually recursive fresh methods, so
+# deep terms neither pay a Python frame per node nor risk hitting the
+# recursion limit. The renaming dict is extended in place at each binder
+# (renaming | {x: x'} would be O(|renaming|) per quantifier) and the previous
+# entry is restored on the way back out.
+_ENTER, _EXIT_F, _EXIT_C = 0, 1, 2
+def _fresh(root, renaming):
+  values = []
+  stack = [(_ENTER, root, None)]
+  while stack:
+    op, t, saved = stack.pop()
+    if op == _ENTER:
+      ty = type(t)
+      if ty is V:
+        y = renaming.get(t.x)
+        values.append(t if y is None else V(y))
+      elif ty is F:
+        x = t.x.fresh()
+        stack.append((_EXIT_F, t, (x, renaming.get(t.x))))
+        renaming[t.x] = x
+        stack.append((_ENTER, t.e, None))
+      elif hasattr(t, '_str_cache'): # an @mixfix-generated node
+        if not renaming and not t._has_binder:
+          values.append(t)
+        else:
+          stack.append((_EXIT_C, t, None))
+          for k in reversed(t.__match_args__):
+            stack.append((_ENTER, getattr(t, k), None))
+      else:
+        values.append(t.fresh(renaming))
+    elif op == _EXIT_F:
+      x, old = saved
+      if old is None: del renaming[t.x]
+      else: renaming[t.x] = old
+      values.append(F(x, values.pop()))
+    else: # _EXIT_C
+      n = len(t.__match_args__)
+      args = values[len(values)-n:]
+      del values[len(values)-n:]
+      values.append(t.__class__(*args))
+  [res] = values
+  return res
 
 
 # ---------- Mixfix decorator ----------
@@ -162,12 +282,24 @@ class Str:
 
   def modes(self): return tuple(m for m in self.kvs)
 
+# Whitespace-insensitive comparison helper for Parser.parses. The deletion
+# table is compiled once at import; translate is a single C-level scan.
+_whitespace_table = str.maketrans('', '', ' \t\n\r\v\f')
+def remove_whitespace(s): return s.translate(_whitespace_table)
+
 # Parser of highly ambiguous grammar updated by each invocation of @mixfix.
 def make_parser():
   # Annoyingly, lark nonterminals must contain only lowercase letters.
   # So munge class names to fit this format. Assumes no class names contain _
   def classname_to_nt(s): return 'c' + ''.join('_' + c.lower() if c.isupper() else c for c in s)
   def nt_to_classname(s): return ''.join('' if c == '_' else c.upper() if prev == '_' else c for (prev, c) in zip(s[1:], s[2:]))
+  # Literal escaping memoized across grammar rebuilds: the same few literals
+  # recur at every rebuild (one per Str in every registered production)
+  escape_cache = {}
+  def escape(s):
+    e = escape_cache.get(s)
+    if e is None: e = escape_cache[s] = f'"{repr(s)[1:-1]}"'
+    return e
   # The grammar is stored as a list of productions. A production like
   #   @mixfix
   #   class Add:
@@ -179,7 +311,6 @@ def make_parser():
   def make_grammar(ps):
     # Naive version of make_fancy_grammar() that puts all productions into a
     # single nonterminal 'term'. Not used but could come in handy for debugging.
-    escape = lambda s: f'"{repr(s)[1:-1]}"'
     def make_prod_item(s):
       if s is F:
         return 'name "." term'
@@ -318,7 +449,6 @@ def make_parser():
         pieces = []
         for (new_l, _), (new_r, v) in zip([(to_prec(c), None)] + p, p):
           if type(v) is str:
-            escape = lambda s: f'"{repr(s)[1:-1]}"'
             if v != '': pieces.append(escape(v))
           elif v is F:
             new_lr = make_lr('bot', new_r)
@@ -354,8 +484,16 @@ def make_parser():
       %import common.WS
       %ignore WS
     '''
+  # Keyed by the full grammar text. Lark cannot serialize Earley parsers
+  # (Lark.save and pickle both refuse), so the cache is in-memory only; it
+  # pays off when precedence declarations dirty the parser without actually
+  # changing the generated grammar.
+  parser_cache = {}
   def make_parser(grammar):
-    return L.Lark(grammar, start='term', ambiguity='explicit')
+    parser = parser_cache.get(grammar)
+    if parser is None:
+      parser = parser_cache[grammar] = L.Lark(grammar, start='term', ambiguity='explicit')
+    return parser
   class Parens:
     '''
     An explicit parenthesization.
@@ -364,6 +502,7 @@ def make_parser():
     should never see instances of this class.
     '''
     __match_args__ = ('x',)
+    _resets_str_context = True # printing inside parens restarts at (bot, bot)
     def __init__(self, x): self.x = x
     def __eq__(self, other): return self.x == other.x
     def __repr__(self): return f'Parens({repr(self.x)})'
@@ -382,29 +521,37 @@ def make_parser():
       def parens(self, s): return Parens(s[0])
     for name, c in constructors.items():
       def go(name, c): # wrapper to get proper lexical scoping
-        def transform(self, args):
-          new_args = []
-          fields = [v for _, v in c.__annotations__.items() if type(v) is not Str]
-          # Each field of type F consumes two arguments: one for the name and one for the body
-          i = 0
-          for v in fields:
-            if v is F:
-              new_args.append(F(args[i], args[i+1]))
-              i += 2
-            else:
-              new_args.append(args[i])
-              i += 1
-          return c(*new_args)
+        # The field shape is fixed per class, so compute it here instead of
+        # on every transform call
+        binds = tuple(v is F for _, v in c.__annotations__.items() if type(v) is not Str)
+        if not any(binds):
+          def transform(self, args): return c(*args)
+        else:
+          def transform(self, args):
+            new_args = []
+            # Each field of type F consumes two arguments: one for the name and one for the body
+            i = 0
+            for is_binding in binds:
+              if is_binding:
+                new_args.append(F(args[i], args[i+1]))
+                i += 2
+              else:
+                new_args.append(args[i])
+                i += 1
+            return c(*new_args)
         setattr(T, name, transform)
       go(name, c)
     return T()
   productions = []
   constructors = {} # mapping from names of classes to themselves
-  global parser_up_to_date
-  # invariant: parser_up_to_date ==> the equalities below always hold
-  grammar = make_fancy_grammar(global_prec_order, productions)
-  parser = make_parser(grammar)
-  transformer = make_transformer(constructors)
+  # invariant: parser_up_to_date and grammar is not None ==>
+  #   the equalities established in update_parser() hold.
+  # Construction is deferred to the first update_parser() call: building an
+  # Earley parser is expensive and the grammar at import time (and after each
+  # batch of @mixfix declarations) would be thrown away unused.
+  grammar = None
+  parser = None
+  transformer = None
   class Parser:
     @staticmethod
     def add_production(p):
@@ -417,7 +564,7 @@ def make_parser():
     def update_parser():
       global parser_up_to_date
       nonlocal grammar, productions, parser, transformer
-      if parser_up_to_date: return
+      if parser_up_to_date and grammar is not None: return
       grammar = make_fancy_grammar(global_prec_order, productions)
       parser = make_parser(grammar)
       transformer = make_transformer(constructors)
@@ -426,6 +573,12 @@ def make_parser():
     def parses(s):
       '''
       Returns the parses that stringify to s up to whitespace and extra parens.
+
+      Each candidate derivation is rendered at most once: duplicates are
+      dropped by the seen-set before transformation, candidates whose
+      printing would insert brackets are rejected by forces_brackets before
+      any string is built, and the survivors' subterm renderings are
+      memoized on the term nodes themselves.
       '''
       nonlocal parser, transformer
       Parser.update_parser()
@@ -434,17 +587,32 @@ def make_parser():
       seen = set()
       count = 0
       dups = 0
-      for tree in L.visitors.CollapseAmbiguities().transform(forest):
+      # The input never changes across candidate trees
+      lhs = remove_whitespace(s)
+      # Rules the transformer can actually construct terms for; anything else
+      # (e.g. bare string/number atoms) has no constructor and is rejected up
+      # front instead of by exception out of the transformer
+      known_rules = set(constructors) | {'name', 'var', 'parens'}
+      trees = (
+        Disambiguator().visit(forest) if Disambiguator is not None else
+        L.visitors.CollapseAmbiguities().transform(forest)
+      )
+      for tree in trees:
         count += 1
-        # Sometimes forest does not share perfectly in highly ambiguous grammars, and there are duplicate trees
-        if tree in seen:
+        # Sometimes forest does not share perfectly in highly ambiguous grammars, and there are duplicate trees.
+        # A single add doubles as the membership test; hashing a tree walks
+        # the whole thing, so do it once per candidate rather than twice.
+        n_seen = len(seen)
+        seen.add(tree)
+        if len(seen) == n_seen:
           dups += 1
           continue
-        seen.add(tree)
-        try: v = transformer.transform(tree)
-        except: continue
-        remove_whitespace = lambda s: ''.join(s.split())
-        lhs = remove_whitespace(s)
+        if any(t.data not in known_rules for t in tree.iter_subtrees()): continue
+        v = transformer.transform(tree)
+        # A candidate can only reproduce the input if printing it inserts no
+        # brackets (every bracket in the input is an explicit Parens node), so
+        # check that structurally before building any strings.
+        if forces_brackets(v): continue
         rhs = remove_whitespace(str(v))
         lhs_matches_rhs = lhs == rhs
         if lhs_matches_rhs:
@@ -555,6 +723,10 @@ def mixfix(c):
   - method simple_names(renaming, in_use) that maximally simplifies disambiguators on bound variable names
   - method fvs() that produces the free variables of an instance of C
   - method no_parens() that removes Paren instances from subtrees
+
+  Note that the generated class cannot use __slots__: the cursor positions
+  are class attributes sharing the field names (C.x is the precedence string
+  while self.x is the subterm), and __slots__ rejects that collision.
   '''
   name = c.__name__
   annotations = c.__annotations__
@@ -562,55 +734,111 @@ def mixfix(c):
   # Luckily, despite being a dict, c.__annotations__ contains items in declaration order,
   # so the order of the mixfix operators is preserved
   fields = tuple(k for k, v in annotations.items() if type(v) is not Str)
+  # Bound attrgetters skip the per-call getattr name lookups in the traversals below
+  field_getters = tuple(attrgetter(k) for k in fields)
   def __init__(self, *args):
     assert len(fields) == len(args)
     for k, arg in zip(fields, args):
       setattr(self, k, arg)
+    self._str_cache = None
+    self._fvs = None
+    # True iff some subterm is an F; missing attribute (e.g. Parens) is
+    # treated as True so we never wrongly skip a freshening
+    self._has_binder = any(getattr(arg, '_has_binder', True) for arg in args)
   def __repr__(self):
-    args = ','.join(repr(getattr(self, k)) for k in fields)
+    args = ','.join(repr(g(self)) for g in field_getters)
     return f'{name}({args})'
-  def __eq__(self, other, renaming={}):
-    return type(self) is type(other) and all(getattr(self, k).__eq__(getattr(other, k), renaming) for k in fields)
-  def to_str(self, mode, left_prec='bot', right_prec='bot', prec_order=global_prec_order):
-    def make_prec(field_name): return f'{name}.{field_name}' if field_name != name else name
-    left_prec_inner = name
-    right_prec_inner = make_prec(tuple(annotations.items())[-1][0]) # OK because annotations nonempty
-    bracketing = not (prec_order.le(left_prec, left_prec_inner) and prec_order.le(right_prec, right_prec_inner))
+  def __eq__(self, other, renaming=None):
+    # Identity short-circuit is only sound when no binder is being renamed:
+    # under a nontrivial renaming, a shared subterm can compare unequal to itself.
+    if self is other and (renaming is None or not (renaming[0] or renaming[1])): return True
+    return type(self) is type(other) and all(g(self).__eq__(g(other), renaming) for g in field_getters)
+  def make_str_prec(field_name): return f'{name}.{field_name}' if field_name != name else name
+  str_left_prec_inner = name
+  str_right_prec_inner = make_str_prec(tuple(annotations.items())[-1][0]) # OK because annotations nonempty
+  def make_str_items(bracketing):
     # (name of cursor position used to recur, corresponding field or None, string to append to output) for each entry in mixfix declaration
-    precs = [('bot' if bracketing else name, None, '')] + list((make_prec(k), None if type(v) is Str else k, v) for (k, v) in annotations.items())
+    precs = [('bot' if bracketing else name, None, '')] + list((make_str_prec(k), None if type(v) is Str else k, v) for (k, v) in annotations.items())
     if bracketing:
       precs[-1] = ('bot', precs[-1][1], precs[-1][2])
     # Compute left and right prec for each item
-    items = (
+    return tuple(
       (l, (k, v), r)
       for (l, _, _), (r, k, v) in zip(precs, precs[1:])
     )
-    res = ''
-    for (left_prec_inner, (k, v), right_prec_inner) in items:
-      if k is not None:
-        res += getattr(self, k).str(mode, left_prec_inner, right_prec_inner, prec_order)
-      else:
-        assert type(v) is Str
-        res += v.in_mode(mode)
-    return self.__class__.bracket(mode, res) if bracketing else res
+  # The item list only depends on whether brackets are inserted, so both
+  # variants can be computed once at declaration time.
+  str_items = {bracketing: make_str_items(bracketing) for bracketing in (False, True)}
+  def make_to_str():
+    # Compile a to_str specialized to this class's layout: the item walk is
+    # unrolled into one concatenation expression per bracketing variant, with
+    # cursor positions baked in as constants. Mode-independent literals are
+    # inlined outright; mode-dependent ones keep their in_mode call.
+    # Terms are immutable once constructed, so a rendering is determined by
+    # the mode, the surrounding cursor positions, and the state of the
+    # precedence poset (whose version stamps the cache key).
+    ns = {'global_prec_order': global_prec_order, '_bracket': c.bracket}
+    def expr_of(items, tag):
+      parts = []
+      for i, (l, (k, v), r) in enumerate(items):
+        if k is not None:
+          parts.append(f'self.{k}.str(mode, {l!r}, {r!r}, prec_order)')
+        elif v.kvs:
+          ns[f'_lit_{tag}{i}'] = v
+          parts.append(f'_lit_{tag}{i}.in_mode(mode)')
+        elif v.s != '': # constant-fold empty literals out of the concatenation
+          parts.append(repr(v.s))
+      return ' + '.join(parts) if parts else repr('')
+    src = f'''
+def to_str(self, mode, left_prec='bot', right_prec='bot', prec_order=global_prec_order):
+  key = (mode, left_prec, right_prec, prec_order.version)
+  cache = self._str_cache
+  if cache is None: cache = self._str_cache = {{}}
+  elif key in cache: return cache[key]
+  if prec_order.le(left_prec, {str_left_prec_inner!r}) and prec_order.le(right_prec, {str_right_prec_inner!r}):
+    res = {expr_of(str_items[False], 'p')}
+  else:
+    res = _bracket(mode, {expr_of(str_items[True], 'b')})
+  cache[key] = res
+  return res
+'''
+    exec(src, ns)
+    return ns['to_str']
+  # The bracketer must be resolved before to_str is generated so it can be
+  # bound as a constant rather than looked up on the class per render
+  if not hasattr(c, 'bracket'):
+    c.bracket = lambda mode, s: parens(s)
+  to_str = make_to_str()
   def __str__(self): return self.str(None)
-  def fresh(self, renaming={}):
-    return self.__class__(*(getattr(self, k).fresh(renaming) for k in fields))
+  def fresh(self, renaming=None):
+    # With no binders below and nothing to rename, freshening is the identity
+    if not renaming and not self._has_binder: return self
+    return _fresh(self, {} if renaming is None else renaming)
   def subst(self, substitution):
-    return self.__class__(*(getattr(self, k).subst(substitution) for k in fields))
+    return self.__class__(*(g(self).subst(substitution) for g in field_getters))
   def simple_names(self, renaming={}, in_use=None):
+    # With no binders below and nothing to rename there is nothing to simplify
+    if not renaming and not self._has_binder: return self
     if in_use is None: in_use = set(v for _, v in renaming.items())
-    return self.__class__(*(getattr(self, k).simple_names(renaming, in_use) for k in fields))
+    return self.__class__(*(g(self).simple_names(renaming, in_use) for g in field_getters))
   def fvs(self):
-    return set(x for k in fields for x in getattr(self, k).fvs())
+    if self._fvs is None:
+      self._fvs = frozenset(x for g in field_getters for x in g(self).fvs())
+    return self._fvs
   def no_parens(self):
-    return self.__class__(*(getattr(self, k).no_parens() for k in fields))
+    return self.__class__(*(g(self).no_parens() for g in field_getters))
   c.__init__ = __init__
   c.__match_args__ = fields
   c.__repr__ = __repr__
   c.__eq__ = __eq__
+  # Terms hash by identity: keep object.__hash__ even if the class body
+  # defined an __eq__ (which would otherwise have set __hash__ to None)
+  c.__hash__ = object.__hash__
   c.__str__ = __str__
   c.str = to_str
+  # Expose the printing layout for forces_brackets' structural walk
+  c._str_items = str_items
+  c._str_prec_inner = (str_left_prec_inner, str_right_prec_inner)
   c.fresh = fresh
   c.subst = subst
   c.simple_names = simple_names
@@ -622,12 +850,31 @@ def mixfix(c):
     prec_name = make_prec(k)
     setattr(c, k, prec_name)
     add_prec(prec_name)
-  if not hasattr(c, 'bracket'):
-    c.bracket = lambda mode, s: parens(s)
   global global_parser
   global_parser.add_production((c, [(make_prec(k), v if type(v) is not Str else v.s) for k, v in annotations.items()]))
   return c
 
+def forces_brackets(v, left_prec='bot', right_prec='bot', prec_order=global_prec_order):
+  '''
+  Whether printing v in the given context would insert brackets anywhere.
+  Used by Parser.parses as a structural pre-filter: a parse whose printing
+  brackets some subterm cannot reproduce an input in which those brackets
+  were absent (explicit parentheses come in as Parens nodes, which reset the
+  printing context), so the string round-trip check can be skipped for it.
+  '''
+  ty = type(v)
+  if ty is V: return False
+  if ty is F: return forces_brackets(v.e, 'bot', right_prec, prec_order)
+  if getattr(ty, '_resets_str_context', False):
+    return forces_brackets(v.x, 'bot', 'bot', prec_order)
+  l_inner, r_inner = ty._str_prec_inner
+  if not (prec_order.le(left_prec, l_inner) and prec_order.le(right_prec, r_inner)):
+    return True
+  return any(
+    k is not None and forces_brackets(getattr(v, k), l, r, prec_order)
+    for (l, (k, _), r) in ty._str_items[False]
+  )
+
 # ---------- Examples ----------
 
 if __name__ == '__main__':